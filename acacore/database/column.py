@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 from typing import Callable
@@ -24,20 +25,9 @@ _sql_schema_types: dict[str, str] = {
     "null": "text",
 }
 
-_sql_schema_type_converters: dict[
-    str,
-    tuple[Callable[[Any | None], SQLValue], Callable[[SQLValue], Any | None]],
-] = {
-    "path": (str, Path),
-    "date-time": (datetime.isoformat, datetime.fromisoformat),
-    "uuid4": (str, UUID),
-    "binary": (bytes, bytes),
-    "string": (str, str),
-    "integer": (int, int),
-    "number": (float, float),
-    "boolean": (bool, bool),
-    "null": (lambda x: x, lambda x: x),
-}
+
+def _identity(value: SQLValue) -> SQLValue:
+    return value
 
 
 def _value_to_sql(value: SQLValue) -> str:
@@ -66,7 +56,41 @@ def _dump_object(obj: list | tuple | dict | BaseModel) -> list | dict:
         return obj
 
 
-@dataclass
+def _json_to_sql(value: object | None) -> str | None:
+    return None if value is None else dumps(_dump_object(value), default=str).decode("utf-8")
+
+
+def _json_from_sql(value: str | bytes | None) -> object | None:
+    return None if value is None else loads(value)
+
+
+# sqlite3 already returns str, int, and float values, so they need no conversion
+_sql_schema_type_converters: dict[
+    str,
+    tuple[Callable[[Any], SQLValue], Callable[[SQLValue], Any]],
+] = {
+    "path": (str, Path),
+    "date-time": (datetime.isoformat, datetime.fromisoformat),
+    "uuid4": (str, UUID),
+    "binary": (bytes, bytes),
+    "string": (str, _identity),
+    "integer": (int, _identity),
+    "number": (float, _identity),
+    "boolean": (bool, bool),
+    "null": (_identity, _identity),
+}
+
+# None values are never converted, so NOT NULL constraints still reject them when writing
+_sql_schema_type_converters_nullable: dict[
+    str,
+    tuple[Callable[[Any | None], SQLValue], Callable[[SQLValue], Any | None]],
+] = {
+    type_name: tuple(f if f is _identity else or_none(f) for f in converters)
+    for type_name, converters in _sql_schema_type_converters.items()
+}
+
+
+@dataclass(slots=True, frozen=True)
 class ColumnSpec:
     """
     Class representing a SQLite column.
@@ -121,23 +145,18 @@ class ColumnSpec:
             type_name: str = schema.get("format", schema_type)
 
             if schema_type in ("object", "array"):
-                sql_type, to_sql, from_sql = (
-                    "text",
-                    lambda x: None if x is None else dumps(_dump_object(x), default=str).decode("utf-8"),
-                    lambda x: None if x is None else loads(x),
-                )
+                sql_type, to_sql, from_sql = "text", _json_to_sql, _json_from_sql
             elif type_name in _sql_schema_type_converters:
-                to_sql, from_sql = _sql_schema_type_converters[type_name]
-                to_sql, from_sql = or_none(to_sql), or_none(from_sql)
+                # Values read from NOT NULL columns cannot be None, so they skip the check
+                to_sql = _sql_schema_type_converters_nullable[type_name][0]
+                from_sql = (_sql_schema_type_converters_nullable if nullable else _sql_schema_type_converters)[
+                    type_name
+                ][1]
             else:
                 raise TypeError(f"Cannot recognize type from schema {schema!r}")
         elif schema_any_of:
             if not schema_any_of[0] or len(schema_any_of) > 2:
-                sql_type, to_sql, from_sql = (
-                    "text",
-                    lambda x: None if x is None else dumps(_dump_object(x), default=str).decode("utf-8"),
-                    lambda x: None if x is None else loads(x),
-                )
+                sql_type, to_sql, from_sql = "text", _json_to_sql, _json_from_sql
             else:
                 spec = cls.from_schema(name, {**schema_any_of[0], **schema}, defs)
                 sql_type, to_sql, from_sql = spec.type, spec.to_sql, spec.from_sql
@@ -155,7 +174,14 @@ class ColumnSpec:
         :param ignore: A list of column names to ignore.
         :return: A list of ``ColumnSpec`` instances.
         """
-        schema: dict = model.model_json_schema()
-        ignore = ignore or []
+        return list(_columns_from_model(cls, model, tuple(ignore or [])))
+
 
-        return [cls.from_schema(p, s, schema.get("$defs")) for p, s in schema["properties"].items() if p not in ignore]
+# Generating the JSON schema of a model is slow, and tables with the same model share the same columns,
+# which is safe because ColumnSpec instances are frozen
+@lru_cache(maxsize=64)
+def _columns_from_model(
+    cls: Type[ColumnSpec], model: Type[BaseModel], ignore: tuple[str, ...]
+) -> tuple[ColumnSpec, ...]:
+    schema: dict = model.model_json_schema()
+    return tuple(cls.from_schema(p, s, schema.get("$defs")) for p, s in schema["properties"].items() if p not in ignore)
@@ -1,21 +1,66 @@
+from functools import partial
 from itertools import islice
+from operator import call
 from sqlite3 import Cursor as SQLiteCursor
 from sqlite3 import Row
 from typing import Any
 from typing import Callable
 from typing import Generator
 from typing import Generic
+from typing import Iterator
 from typing import Type
 from typing import TypeVar
 
 from pydantic import BaseModel
 
+from .column import _identity
 from .column import ColumnSpec
 from .column import SQLValue
 
 _M = TypeVar("_M", bound=BaseModel)
 
 
+def _construct(construct: Callable[..., _M], values: dict[str, Any]) -> _M:
+    return construct(**values)
+
+
+def _row_decoder(model: Type[_M], columns: list[ColumnSpec], validate: bool) -> Callable[[tuple[SQLValue, ...]], _M]:
+    """
+    Build a function that converts a row of values into an instance of the model.
+
+    :param model: The model to return data as.
+    :param columns: The columns of the row, in the same order as the values.
+    :param validate: Whether to validate the values with the model.
+    :return: A function that takes a tuple of values and returns a model instance.
+    """
+    keys: tuple[str, ...] = tuple(c.name for c in columns)
+    converters: tuple[Callable[[SQLValue], Any], ...] = tuple(c.from_sql for c in columns)
+    build: Callable[[dict[str, Any]], _M] = (
+        model.model_validate if validate else partial(_construct, model.model_construct)
+    )
+
+    if all(f is _identity for f in converters):
+        return lambda r: build(dict(zip(keys, r)))
+    else:
+        return lambda r: build(dict(zip(keys, map(call, converters, r))))
+
+
+def _named_row_decoder(model: Type[_M], columns: list[ColumnSpec], validate: bool) -> Callable[[Row], _M]:
+    """
+    Build a function that converts a ``sqlite3.Row`` into an instance of the model, matching the columns by name.
+
+    :param model: The model to return data as.
+    :param columns: The columns to read from the row, in any order.
+    :param validate: Whether to validate the values with the model.
+    :return: A function that takes a ``sqlite3.Row`` and returns a model instance.
+    """
+    cols: dict[str, Callable[[SQLValue], Any]] = {c.name: c.from_sql for c in columns}
+    build: Callable[[dict[str, Any]], _M] = (
+        model.model_validate if validate else partial(_construct, model.model_construct)
+    )
+    return lambda r: build({k: f(r[k]) for k, f in cols.items()})
+
+
 class Cursor(Generic[_M]):
     """
     Class that wraps arund an SQLite cursor to return Pydantic models instead of value tuples.
@@ -25,25 +70,42 @@ class Cursor(Generic[_M]):
     :ivar columns: A list of ``ColumnSpec`` instances that describe the columns in the cursor.
     """
 
-    def __init__(self, cursor: SQLiteCursor, model: Type[_M], columns: list[ColumnSpec]) -> None:
+    __slots__ = ("_row", "columns", "cursor", "model")
+
+    def __init__(
+        self,
+        cursor: SQLiteCursor,
+        model: Type[_M],
+        columns: list[ColumnSpec],
+        *,
+        validate: bool = True,
+        decoder: Callable[[tuple[SQLValue, ...]], _M] | None = None,
+    ) -> None:
         """
         :param cursor: The SQLite cursor
         :param model: The model to return data as.
         :param columns: A list of ``ColumnSpec`` instances that describe the columns in the cursor.
+        :param validate: Whether to validate the rows with the model. If False, models are constructed from the
+            values as they are, which is faster but only safe for trusted rows, defaults to True.
+        :param decoder: A function that converts a tuple of values into a model, reading them by position. Tables
+            pass the one they built for their columns, which they select in the same order. If not given, the rows
+            are read as ``sqlite3.Row`` and the values are matched to ``columns`` by name.
         """  # noqa: D205
-        self.cursor: SQLiteCursor[Row] = cursor
-        self.cursor.row_factory = Row
+        self.cursor: SQLiteCursor = cursor
         self.model: Type[_M] = model
         self.columns: list[ColumnSpec] = columns
-        self._cols: dict[str, Callable[[SQLValue], Any]] = {c.name: c.from_sql for c in columns}
-        self._row: Callable[[Row], _M] = lambda r: self.model.model_validate(
-            {k: f(r[k]) for k, f in self._cols.items()}
-        )
+        self._row: Callable[[Any], _M]
+        if decoder is None:
+            self.cursor.row_factory = Row
+            self._row = _named_row_decoder(model, columns, validate)
+        else:
+            self.cursor.row_factory = None
+            self._row = decoder
 
     @property
-    def rows(self) -> Generator[_M, None, None]:
-        """The rows of the cursor as a generator."""
-        return (self._row(row) for row in self.cursor)
+    def rows(self) -> Iterator[_M]:
+        """The rows of the cursor as an iterator."""
+        return map(self._row, self.cursor)
 
     def __iter__(self) -> Generator[_M, None, None]:
         yield from self.rows
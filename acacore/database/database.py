@@ -1,8 +1,10 @@
 from collections.abc import Sequence
+from contextlib import suppress
 from os import PathLike
 from pathlib import Path
 from sqlite3 import Connection
 from sqlite3 import Cursor as SQLiteCursor
+from sqlite3 import OperationalError
 from sqlite3 import ProgrammingError
 from types import TracebackType
 from typing import Iterable
@@ -22,6 +24,27 @@ from .table_view import View
 _M = TypeVar("_M", bound=BaseModel)
 _P = Sequence[SQLValue] | Mapping[str, SQLValue]
 
+# Connection settings for write-heavy work on local databases, they only last as long as the connection
+# The journal mode is left out, as write-ahead logging persists in the database file
+_TUNING_PRAGMAS: dict[str, str | int] = {
+    "synchronous": "normal",
+    "temp_store": "memory",
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+}
+
+
+def _set_pragmas(connection: Connection, pragmas: dict[str, str | int]):
+    """
+    Set pragmas on a connection, skipping any that cannot be changed, e.g., the journal mode of read-only databases.
+
+    :param connection: The connection to set the pragmas on.
+    :param pragmas: The pragmas to set in the form {pragma name: value}.
+    """
+    for pragma, value in pragmas.items():
+        with suppress(OperationalError):
+            connection.execute(f"pragma {pragma} = {value}")
+
 
 class Database:
     """
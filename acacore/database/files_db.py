@@ -1,3 +1,4 @@
+from functools import cached_property
 from os import PathLike
 from pathlib import Path
 from sqlite3 import DatabaseError
@@ -15,6 +16,8 @@ from acacore.models.file import OriginalFile
 from acacore.models.metadata import Metadata
 from acacore.models.reference_files import TActionType
 
+from .database import _set_pragmas
+from .database import _TUNING_PRAGMAS
 from .database import Database
 from .database import KeysTable
 from .database import Table
@@ -22,6 +25,45 @@ from .database import View
 from .upgrade import is_latest
 from .upgrade import upgrade
 
+_ORIGINAL_FILES: str = "files_original"
+_MASTER_FILES: str = "files_master"
+_ACCESS_FILES: str = "files_access"
+_STATUTORY_FILES: str = "files_statutory"
+_LOG: str = "log"
+
+_ALL_FILES_SELECT: str = f"""
+select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {_ORIGINAL_FILES}
+union
+select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {_MASTER_FILES}
+union
+select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {_ACCESS_FILES}
+union
+select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {_STATUTORY_FILES}
+"""
+_LOG_PATHS_SELECT: str = f"""
+select coalesce(fo.relative_path, fm.relative_path, fa.relative_path, fs.relative_path) as file_relative_path, l.* from {_LOG} l
+    left join {_ORIGINAL_FILES}  fo on l.file_type = 'original'  and fo.uuid = l.file_uuid
+    left join {_MASTER_FILES}    fm on l.file_type = 'master'    and fm.uuid = l.file_uuid
+    left join {_ACCESS_FILES}    fa on l.file_type = 'access'    and fa.uuid = l.file_uuid
+    left join {_STATUTORY_FILES} fs on l.file_type = 'statutory' and fs.uuid = l.file_uuid
+"""
+_IDENTIFICATION_WARNING_WHERE: str = "(warning is not null or puid is null)"
+_IDENTIFICATION_WARNINGS_SELECT: str = (
+    f"select * from {_ORIGINAL_FILES} where {_IDENTIFICATION_WARNING_WHERE} and size != 0"
+)
+_SIGNATURES_COUNT_SELECT: str = (
+    f"select puid, signature, count(*) as count from {_ORIGINAL_FILES} group by puid, signature order by count desc"
+)
+_ACTIONS_COUNT_SELECT: str = (
+    f"select action, count(*) as count from {_ORIGINAL_FILES} group by action order by count desc"
+)
+_CHECKSUMS_COUNT_SELECT: str = (
+    f"select checksum, count(*) as count from {_ORIGINAL_FILES} group by checksum order by count desc"
+)
+
+# Databases whose version has been checked, identified by path and file identity, see FilesDB._version_cache_key
+_verified_databases: set[tuple[Path, int, int, int, int]] = set()
+
 
 class EventPath(Event):
     file_relative_path: Path | None = None
@@ -51,14 +93,9 @@ class FilesDB(Database):
     :ivar master_files: The table containing the master archival files.
     :ivar access_files: The table containing the access files.
     :ivar statutory_files: The table containing the statutory files.
-    :ivar all_files: A view showing all files in the database.
     :ivar log: The table containing the event log.
-    :ivar log_paths: A view containing the event log together with the path of the files for events that reference them.
-    :ivar identification_warnings: A view containing a list of files from "original files" that have identification issues.
-    :ivar signatures_count: A view containing a list of all PUIDs from "original files" and how many times they occur.
-    :ivar actions_count: A view containing a list of actions from "original files" and how many times they occur.
-    :ivar checksums_count: A view containing a list of checksums from "original files" and how many times they occur.
     :ivar metadata: A table containing metadata about the database itself.
+    :ivar events_buffer_size: How many events added with ``add_event`` are kept in memory before they are inserted.
     """
 
     def __init__(
@@ -72,6 +109,9 @@ class FilesDB(Database):
         check_initialisation: bool = False,
         check_version: bool = True,
         cached_statements: int = 100,
+        events_buffer_size: int = 1000,
+        tune: bool = True,
+        pragmas: dict[str, str | int] | None = None,
     ) -> None:
         """
         :param path: The path to the database.
@@ -86,7 +126,17 @@ class FilesDB(Database):
         :param cached_statements: The number of statements that sqlite3 should internally cache for this connection,
             to avoid parsing overhead, defaults to 100.
         :param check_initialisation: If set to True, ensure the databse is initialized.
-        :param check_version: If set to True, check the database version and ensure it is the latest.
+        :param check_version: If set to True, check the database version and ensure it is the latest. The check is done
+            only once per process for each database file, and repeated if the file is replaced or modified, see
+            ``invalidate_version_cache``.
+        :param events_buffer_size: How many events added with ``add_event`` are kept in memory before they are
+            inserted into the log table, defaults to 1000.
+        :param tune: If set to True (default), use normal synchronisation, memory-mapped I/O, a 64 MiB page cache,
+            and in-memory temporary storage for the connection. Set to False to keep SQLite's defaults. The journal
+            mode is not changed, as write-ahead logging persists in the database file and is not supported on
+            network file systems; enable it explicitly with ``pragmas={"journal_mode": "wal"}``.
+        :param pragmas: Pragmas to set on the connection in the form {pragma name: value}, in addition to or in place
+            of the ones set by ``tune``, e.g., ``{"synchronous": "full"}``.
         """  # noqa: D205
         super().__init__(
             path,
@@ -97,18 +147,28 @@ class FilesDB(Database):
             cached_statements=cached_statements,
         )
 
+        _set_pragmas(self.connection, {**_TUNING_PRAGMAS, **(pragmas or {})} if tune else (pragmas or {}))
+
         self.original_files: Table[OriginalFile] = Table(
             self.connection,
             OriginalFile,
-            "files_original",
+            _ORIGINAL_FILES,
             ["relative_path"],
-            {"uuid": ["uuid"], "checksum": ["checksum"], "action": ["action"]},
+            {
+                "uuid": ["uuid"],
+                "checksum": ["checksum"],
+                "action": ["action"],
+                "puid_signature": ["puid", "signature"],
+                "identification_warnings": ["size"],
+            },
             ["root"],
+            # Lets the identification warnings view read only the matching rows instead of scanning the table
+            indices_where={"identification_warnings": _IDENTIFICATION_WARNING_WHERE},
         )
         self.master_files: Table[MasterFile] = Table(
             self.connection,
             MasterFile,
-            "files_master",
+            _MASTER_FILES,
             ["relative_path"],
             {"uuid": ["uuid"], "checksum": ["checksum"], "original_uuid": ["original_uuid"]},
             ["root"],
@@ -116,7 +176,7 @@ class FilesDB(Database):
         self.access_files: Table[ConvertedFile] = Table(
             self.connection,
             ConvertedFile,
-            "files_access",
+            _ACCESS_FILES,
             ["relative_path"],
             {"uuid": ["uuid"], "checksum": ["checksum"], "original_uuid": ["original_uuid"]},
             ["root"],
@@ -124,87 +184,150 @@ class FilesDB(Database):
         self.statutory_files: Table[ConvertedFile] = Table(
             self.connection,
             ConvertedFile,
-            "files_statutory",
+            _STATUTORY_FILES,
             ["relative_path"],
             {"uuid": ["uuid"], "checksum": ["checksum"], "original_uuid": ["original_uuid"]},
             ["root"],
         )
-        self.all_files: View[BaseFile] = View(
-            self.connection,
-            BaseFile,
-            "files_all",
-            f"""
-            select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {self.original_files.name}
-            union
-            select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {self.master_files.name}
-            union
-            select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {self.access_files.name}
-            union
-            select uuid, checksum, relative_path, is_binary, size, puid, signature, warning from {self.statutory_files.name}
-            """,
-            ignore=["root"],
-        )
 
         self.log: Table[Event] = Table(
             self.connection,
             Event,
-            "log",
+            _LOG,
             indices={"uuid": ["file_uuid", "file_type"], "time": ["time"], "operation": ["operation"]},
         )
-        self.log_paths: View[EventPath] = View(
-            self.connection,
-            EventPath,
-            "log_paths",
-            f"""
-            select coalesce(fo.relative_path, fm.relative_path, fa.relative_path, fs.relative_path) as file_relative_path, l.* from {self.log.name} l
-                left join {self.original_files.name}  fo on l.file_type = 'original'  and fo.uuid = l.file_uuid
-                left join {self.master_files.name}    fm on l.file_type = 'master'    and fm.uuid = l.file_uuid
-                left join {self.access_files.name}    fa on l.file_type = 'access'    and fa.uuid = l.file_uuid
-                left join {self.statutory_files.name} fs on l.file_type = 'statutory' and fs.uuid = l.file_uuid
-            """,
-        )
+        self.metadata: KeysTable[Metadata] = KeysTable(self.connection, Metadata, "metadata")
 
-        self.identification_warnings: View[OriginalFile] = View(
+        self.events_buffer_size: int = events_buffer_size
+        self._events_buffer: list[Event] = []
+
+        if check_initialisation and not self.is_initialised():
+            raise DatabaseError("Database is not initialized")
+
+        if check_version and (key := self._version_cache_key()) not in _verified_databases and self.is_initialised():
+            is_latest(self.connection, raise_on_difference=True)
+            if key:
+                _verified_databases.add(key)
+
+    @classmethod
+    def invalidate_version_cache(cls):
+        """Forget which databases have had their version checked, so the check is repeated on the next open."""
+        _verified_databases.clear()
+
+    def _version_cache_key(self) -> tuple[Path, int, int, int, int] | None:
+        """
+        The key used to remember that the database's version was checked, ``None`` for databases without a file.
+
+        The key includes the device, inode, modification time, and size of the file, so a database file that is
+        replaced or modified is checked again.
+        """
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return self.path.resolve(), stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @cached_property
+    def all_files(self) -> View[BaseFile]:
+        """A view showing all files in the database."""
+        return View(self.connection, BaseFile, "files_all", _ALL_FILES_SELECT, ignore=["root"])
+
+    @cached_property
+    def log_paths(self) -> View[EventPath]:
+        """A view containing the event log together with the path of the files for events that reference them."""
+        return View(self.connection, EventPath, "log_paths", _LOG_PATHS_SELECT)
+
+    @cached_property
+    def identification_warnings(self) -> View[OriginalFile]:
+        """A view containing a list of files from "original files" that have identification issues."""
+        return View(
             self.connection,
             OriginalFile,
             "view_identification_warnings",
-            f"select * from {self.original_files.name} where (warning is not null or puid is null) and size != 0",
+            _IDENTIFICATION_WARNINGS_SELECT,
             ignore=["root"],
         )
 
-        self.signatures_count: View[SignatureCount] = View(
+    @cached_property
+    def signatures_count(self) -> View[SignatureCount]:
+        """A view containing a list of all PUIDs from "original files" and how many times they occur."""
+        return View(
             self.connection,
             SignatureCount,
             "view_signatures_count",
-            f"select puid, signature, count(*) as count from {self.original_files.name} group by puid, signature order by count desc",
+            _SIGNATURES_COUNT_SELECT,
+            validate=False,
         )
 
-        self.actions_count: View[ActionCount] = View(
-            self.connection,
-            ActionCount,
-            "view_actions_count",
-            f"select action, count(*) as count from {self.original_files.name} group by action order by count desc",
-        )
+    @cached_property
+    def actions_count(self) -> View[ActionCount]:
+        """A view containing a list of actions from "original files" and how many times they occur."""
+        return View(self.connection, ActionCount, "view_actions_count", _ACTIONS_COUNT_SELECT, validate=False)
 
-        self.checksums_count: View[ChecksumCount] = View(
+    @cached_property
+    def checksums_count(self) -> View[ChecksumCount]:
+        """A view containing a list of checksums from "original files" and how many times they occur."""
+        return View(
             self.connection,
             ChecksumCount,
             "view_checksums_count",
-            f"select checksum, count(*) as count from {self.original_files.name} group by checksum order by count desc",
+            _CHECKSUMS_COUNT_SELECT,
+            validate=False,
         )
 
-        self.metadata: KeysTable[Metadata] = KeysTable(self.connection, Metadata, "metadata")
+    def commit(self):
+        """Insert any buffered events and commit any pending transaction to the database."""
+        self.flush_events()
+        super().commit()
 
-        if check_initialisation and not self.is_initialised():
-            raise DatabaseError("Database is not initialized")
+    def rollback(self):
+        """Discard any buffered events and roll back to the start of any pending transaction."""
+        self._events_buffer.clear()
+        super().rollback()
 
-        if check_version and self.is_initialised():
-            is_latest(self.connection, raise_on_difference=True)
+    def close(self):
+        """Insert any buffered events and close the database connection."""
+        self.flush_events()
+        super().close()
+
+    @property
+    def uncommitted_changes(self):
+        """Return the total number of database row changes and buffered events that have yet to be committed."""
+        return super().uncommitted_changes + len(self._events_buffer)
+
+    def add_event(self, *events: Event, flush: bool = False):
+        """
+        Add events to the log table.
+
+        The events are kept in a buffer and inserted all at once when the buffer holds ``events_buffer_size`` events,
+        when ``flush_events`` is called, or when the database is committed or closed. Buffered events are not visible in
+        the log table until they are inserted, they count as uncommitted changes, and they are discarded on rollback.
+
+        :param events: The events to add.
+        :param flush: Set to ``True`` to insert the events, and any other buffered ones, immediately.
+        """
+        self._events_buffer.extend(events)
+        if flush or len(self._events_buffer) >= self.events_buffer_size:
+            self.flush_events()
+
+    def flush_events(self) -> int:
+        """
+        Insert all buffered events into the log table.
+
+        :return: The number of inserted events.
+        """
+        if not self._events_buffer:
+            return 0
+        inserted: int = self.log.insert(*self._events_buffer)
+        self._events_buffer.clear()
+        return inserted
 
     def upgrade(self):
         """
         Upgrade the database to the latest version.
 
+        Indices that were added to the original files table without a new version are created if missing.
+
         :raise DatabaseError: If the database is not initialized or if there are uncommitted changes.
         """
         if not self.is_initialised():
@@ -212,6 +335,17 @@ class FilesDB(Database):
         if self.uncommitted_changes:
             raise DatabaseError("Database has uncommitted changes")
         upgrade(self.connection)
+        for index_sql in self.original_files.indices_sql(exist_ok=True):
+            self.execute(index_sql)
+        self.commit()
+
+    def _stored_version(self) -> str | None:
+        """Get the version stored in the metadata table, or ``None`` if the table does not exist or has no version."""
+        metadata_exists = self.execute(
+            "select 1 from sqlite_master where type = 'table' and name = ?",
+            [self.metadata.name],
+        ).fetchone()
+        return self.metadata.get("version") if metadata_exists is not None else None
 
     def is_initialised(self) -> bool:
         """
@@ -219,7 +353,7 @@ class FilesDB(Database):
 
         :return: ``True`` if the database is initialised, ``False`` otherwise.
         """
-        return self.metadata.name in self.tables() and self.metadata.get("version")
+        return bool(self._stored_version())
 
     def version(self) -> Version:
         """
@@ -228,8 +362,8 @@ class FilesDB(Database):
         :return: The database version as a ``Version`` object.
         :raise DatabaseError: If the database is not initialized.
         """
-        if self.is_initialised():
-            return Version(self.metadata.get("version"))
+        if version := self._stored_version():
+            return Version(version)
         raise DatabaseError("Not initialised")
 
     @overload
@@ -240,10 +374,18 @@ class FilesDB(Database):
         """
         Initialize the database with all the necessary tables and views.
 
+        The tables, views, and indices are created in a single transaction. When called on an existing ``FilesDB``
+        instance, the transaction is left to the caller to commit, unless the connection is in autocommit mode.
+
         :return: An instance of ``FilesDB``.
         """
         db = self if isinstance(self, FilesDB) else FilesDB(self)
 
+        # Run all statements in one transaction, so they are written to disk at once
+        begin: bool = not db.connection.in_transaction
+        if begin:
+            db.execute("begin")
+
         db.original_files.create(exist_ok=True)
         db.master_files.create(exist_ok=True)
         db.access_files.create(exist_ok=True)
@@ -259,7 +401,7 @@ class FilesDB(Database):
         if not db.metadata.get():
             db.metadata.set(Metadata())
 
-        if not isinstance(self, FilesDB):
+        if not isinstance(self, FilesDB) or (begin and db.connection.isolation_level is None):
             db.commit()
 
         return db
@@ -1,10 +1,19 @@
-from re import sub
+from functools import lru_cache
+from itertools import chain
+from itertools import islice
+from re import compile as re_compile
 from sqlite3 import Connection
 from sqlite3 import ProgrammingError
+from sqlite3 import SQLITE_LIMIT_VARIABLE_NUMBER
+from typing import Any
+from typing import Callable
 from typing import Generator
 from typing import Generic
+from typing import Iterable
 from typing import Literal
+from typing import Mapping
 from typing import Self
+from typing import Sequence
 from typing import Type
 from typing import TypeVar
 
@@ -12,11 +21,15 @@ from pydantic import BaseModel
 
 from .column import ColumnSpec
 from .column import SQLValue
+from .cursor import _row_decoder
 from .cursor import Cursor
 
 _M = TypeVar("_M", bound=BaseModel)
 _W = str | dict[str, SQLValue | list[SQLValue]]
 
+_INSERT_ROWS_PER_STATEMENT: int = 500
+_where_prefix_regexp = re_compile(r"^where\s+")
+
 
 def _where_dict_to_sql(where: dict[str, SQLValue | list[SQLValue]]) -> tuple[str, list[SQLValue]]:
     """
@@ -49,6 +62,17 @@ def _where_dict_to_sql(where: dict[str, SQLValue | list[SQLValue]]) -> tuple[str
     return " and ".join(sql).strip(), params
 
 
+@lru_cache(maxsize=64)
+def _order_by_to_sql(order_by: tuple[tuple[str, str], ...]) -> str:
+    """
+    Convert a list of column names and direction tuples into an SQL order by expression.
+
+    :param order_by: A tuple of column names and direction ("asc", "desc") tuples.
+    :return: The SQL order by expression as a string.
+    """
+    return ",".join(f"{o} {d}" for o, d in order_by)
+
+
 def _where_to_sql(
     where: _W | BaseModel,
     params: list[SQLValue] | None,
@@ -72,7 +96,7 @@ def _where_to_sql(
     elif isinstance(where, BaseModel):
         where, params = _where_dict_to_sql({pk.name: pk.to_sql(getattr(where, pk.name)) for pk in primary_keys})
     elif isinstance(where, str):
-        where = sub(r"^where\s+", "", where) if where.strip() else ""
+        where = _where_prefix_regexp.sub("", where) if where.strip() else ""
     elif isinstance(where, dict):
         where, params = _where_dict_to_sql(where)
     else:
@@ -89,6 +113,8 @@ class Table(Generic[_M]):
     :ivar model: The model the table is based on.
     :ivar name: The name of the table.
     :ivar columns: The columns in the table as a dictionary of name keys and ``ColumnSpec`` values.
+    :ivar indices_where: The conditions of partial indices as a dictionary of index name keys and SQL expressions.
+    :ivar validate: Whether selected rows are validated with the model.
     """
 
     def __init__(
@@ -99,6 +125,9 @@ class Table(Generic[_M]):
         primary_keys: list[str] | None = None,
         indices: dict[str, list[str]] | None = None,
         ignore: list[str] | None = None,
+        *,
+        indices_where: dict[str, str] | None = None,
+        validate: bool = True,
     ) -> None:
         """
         :param database: The connection to the database.
@@ -107,14 +136,28 @@ class Table(Generic[_M]):
         :param primary_keys: The primary keys of the table.
         :param indices: The indices of the table as index in the form {index name: list of indexed columns}.
         :param ignore: A list of field names to ignore from the model.
+        :param indices_where: Conditions to make partial indices in the form {index name: SQL expression}. A partial
+            index only contains the rows matching its condition, and it is used by queries whose where clause
+            includes the same expression.
+        :param validate: Whether to validate selected rows with the model. Set to False to construct models without
+            validation for tables whose rows can be trusted, defaults to True.
         """  # noqa: D205
         self.database: Connection = database
         self.model: Type[_M] = model
-        self.name: str = name
+        self.validate: bool = validate
         self.columns: dict[str, ColumnSpec] = {c.name: c for c in ColumnSpec.from_model(self.model, ignore)}
+        self._columns: list[ColumnSpec] = list(self.columns.values())
+        self._columns_to_sql: tuple[tuple[str, Callable[[Any], SQLValue]], ...] = tuple(
+            (c.name, c.to_sql) for c in self._columns
+        )
+        self._row_decoders: dict[bool, Callable[[tuple[SQLValue, ...]], _M]] = {
+            v: _row_decoder(self.model, self._columns, v) for v in (True, False)
+        }
 
         _primary_keys: set[str] = set(primary_keys or [])
-        _indices: dict[str, set[str]] = {_i: set(cs) for i, cs in (indices or {}).items() if (_i := i.strip())}
+        _indices: dict[str, list[str]] = {
+            _i: list(dict.fromkeys(cs)) for i, cs in (indices or {}).items() if (_i := i.strip())
+        }
 
         if missing_keys := [pk for pk in _primary_keys if pk not in self.columns]:
             raise ValueError(
@@ -126,18 +169,70 @@ class Table(Generic[_M]):
                 f"Index keys {', '.join(map(repr, missing_keys))} do not exist in model {self.model.__name__!r}"
             )
 
+        if missing_indices := [i for i in (indices_where or {}) if i.strip() not in _indices]:
+            raise ValueError(f"Partial indices {', '.join(map(repr, missing_indices))} are not defined in indices")
+
         self.primary_keys: list[ColumnSpec] = [self.columns[pk] for pk in _primary_keys]
         self.indices: dict[str, list[ColumnSpec]] = {i: [self.columns[c] for c in cs] for i, cs in _indices.items()}
+        self.indices_where: dict[str, str] = {i.strip(): w for i, w in (indices_where or {}).items() if w.strip()}
+        # Primary keys cannot be null, so instances of the model can always be matched with "="
+        self._primary_keys_where: str | None = (
+            " and ".join(f"{pk.name} = ?" for pk in self.primary_keys)
+            if self.primary_keys and not any(pk.nullable for pk in self.primary_keys)
+            else None
+        )
+        self.name = name
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.name!r}, {self.model.__name__})"
 
+    @property
+    def name(self) -> str:
+        """The name of the table."""
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+        columns_sql: str = ",".join(c.name for c in self._columns)
+        into_sql: str = f"into {name} ({columns_sql})"
+        self._select_sql: str = f"select {columns_sql} from {name}"
+        self._count_sql: str = f"select count(*) from {name}"
+        self._exists_sql: str = f"select 1 from {name}"
+        # Insert statements as the text before and after the values
+        self._insert_sql: dict[str, tuple[str, str]] = {
+            "error": (f"insert {into_sql} values", ""),
+            "ignore": (f"insert or ignore {into_sql} values", ""),
+            "replace": (f"insert or replace {into_sql} values", ""),
+        }
+        # Update existing rows in place rather than deleting and reinserting them
+        update_columns: list[ColumnSpec] = [c for c in self._columns if c not in self.primary_keys]
+        if self.primary_keys and update_columns:
+            conflict_sql: str = ",".join(pk.name for pk in self.primary_keys)
+            set_sql: str = ",".join(f"{c.name} = excluded.{c.name}" for c in update_columns)
+            self._insert_sql["upsert"] = (
+                f"insert {into_sql} values",
+                f" on conflict ({conflict_sql}) do update set {set_sql}",
+            )
+        else:
+            self._insert_sql["upsert"] = self._insert_sql["replace"]
+        self._insert_row_sql: str = f"({','.join('?' * len(self._columns))})"
+        self._insert_select_sql: dict[str, str] = {
+            "error": f"insert {into_sql} select {columns_sql} from",
+            "ignore": f"insert or ignore {into_sql} select {columns_sql} from",
+            "replace": f"insert or replace {into_sql} select {columns_sql} from",
+        }
+        self._update_sql: str = f"update {name} set {','.join(f'{c.name} = ?' for c in self._columns)}"
+
     def __iter__(self) -> Generator[_M, None, None]:
         yield from self.select()
 
     def __len__(self) -> int:
         return self.count()
 
+    def __bool__(self) -> bool:
+        return self.exists()
+
     def __getitem__(self, where: _W | _M) -> _M | None:
         return self.select(where, limit=1).fetchone()
 
@@ -151,7 +246,7 @@ class Table(Generic[_M]):
         self.delete(where)
 
     def __contains__(self, where: _M) -> bool:
-        return self.select(where, limit=1).cursor.fetchone() is not None
+        return self.exists(where)
 
     def create_sql(self, *, exist_ok: bool = False) -> str:
         """Generate the SQL statement to create the table."""
@@ -174,6 +269,7 @@ class Table(Generic[_M]):
         """Generate the SQL statements to create the tables' indices."""
         return [
             f"create index {'if not exists' if exist_ok else ''} idx_{self.name}_{index} on {self.name} ({','.join(c.name for c in cols)})"
+            + (f" where {self.indices_where[index]}" if index in self.indices_where else "")
             for index, cols in self.indices.items()
         ]
 
@@ -188,6 +284,60 @@ class Table(Generic[_M]):
             self.database.execute(index_sql)
         return self
 
+    def _where_to_sql(self, where: _W | _M | None, params: list[SQLValue] | None) -> tuple[str, list[SQLValue]]:
+        """
+        Turn a where statement/dict/model into an SQL string and parameters list, see ``_where_to_sql``.
+
+        Instances of the model are matched by primary keys with a where expression built once for the table.
+        """
+        if self._primary_keys_where and isinstance(where, BaseModel):
+            return self._primary_keys_where, [pk.to_sql(getattr(where, pk.name)) for pk in self.primary_keys]
+        return _where_to_sql(where, params, self.primary_keys)
+
+    def _build_select(
+        self,
+        select_sql: str,
+        where: _W | _M | None,
+        params: list[SQLValue] | None,
+        order_by: list[tuple[str, str]] | None,
+        limit: int | None,
+        offset: int | None,
+    ) -> tuple[str, list[SQLValue]]:
+        """
+        Build a select statement and its parameters.
+
+        :param select_sql: The select expression, including the from clause.
+        :return: A tuple containing the SQL statement and the list of parameters.
+        """
+        where, params = self._where_to_sql(where, params)
+
+        sql: list[str] = [select_sql]
+
+        if where:
+            sql.append(f"where {where}")
+
+        if order_by:
+            sql.append(f"order by {_order_by_to_sql(tuple(map(tuple, order_by)))}")
+
+        # Bind limit and offset, so the statement text, and its entry in the statement cache, is the same for all values
+        # Named parameters cannot be mixed with positional ones, so they are bound by name in that case
+        if limit is not None:
+            if isinstance(params, Mapping):
+                sql.append("limit :_limit")
+                params = {**params, "_limit": limit}
+            else:
+                sql.append("limit ?")
+                params = [*params, limit]
+        if offset is not None:
+            if isinstance(params, Mapping):
+                sql.append("offset :_offset")
+                params = {**params, "_offset": offset}
+            else:
+                sql.append("offset ?")
+                params = [*params, offset]
+
+        return " ".join(sql), params
+
     def select(
         self,
         where: _W | _M | None = None,
@@ -195,6 +345,8 @@ class Table(Generic[_M]):
         order_by: list[tuple[str, str]] | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        *,
+        validate: bool | None = None,
     ) -> Cursor[_M]:
         """
         Select entries from the table.
@@ -206,24 +358,77 @@ class Table(Generic[_M]):
         :param order_by: A list of column names and direction ("asc", "desc") tuples to sort the results.
         :param limit: The maximum number of results to return.
         :param offset: The offset to start the results from.
+        :param validate: Whether to validate the selected rows with the model, overriding the table's ``validate``
+            setting for this query only.
         :return: A ``Cursor`` instance.
         """
-        where, params = _where_to_sql(where, params, self.primary_keys)
-
-        sql: list[str] = [f"select * from {self.name}"]
-
-        if where:
-            sql.append(f"where {where}")
-
-        if order_by:
-            sql.append(f"order by {','.join(o + ' ' + d for o, d in order_by)}")
+        sql, params = self._build_select(self._select_sql, where, params, order_by, limit, offset)
+        return Cursor(
+            self.database.execute(sql, params),
+            self.model,
+            self._columns,
+            decoder=self._row_decoders[self.validate if validate is None else validate],
+        )
+
+    def select_after(
+        self,
+        after: Sequence[SQLValue],
+        order_by: list[tuple[str, str]],
+        where: _W | _M | None = None,
+        params: list[SQLValue] | None = None,
+        limit: int | None = None,
+        *,
+        validate: bool | None = None,
+    ) -> Cursor[_M]:
+        """
+        Select the entries that come after a given one in the order given by ``order_by``.
 
-        if limit is not None:
-            sql.append(f"limit {limit}")
-        if offset is not None:
-            sql.append(f"offset {offset}")
+        Unlike ``offset``, which makes SQLite step through and discard every skipped row, the rows are searched
+        directly from the last seen values. The columns in ``order_by`` should not contain null values and should
+        identify each row uniquely, e.g., by ending with the primary keys, and an index on them allows SQLite to find
+        the next row without sorting.
 
-        return Cursor(self.database.execute(" ".join(sql), params), self.model, list(self.columns.values()))
+        :param after: The values of the ``order_by`` columns in the last row of the previous page.
+        :param order_by: A list of column names and direction ("asc", "desc") tuples to sort the results.
+        :param where: The where statement to use, see ``Table.select``.
+        :param params: The parameters to use for the query, they are ignored if the ``where`` argument is anything but
+            a string.
+        :param limit: The maximum number of results to return.
+        :param validate: Whether to validate the selected rows with the model, see ``Table.select``.
+        :return: A ``Cursor`` instance.
+        """
+        if len(after) != len(order_by):
+            raise ValueError(f"Expected {len(order_by)} values after, got {len(after)}")
+
+        where, params = self._where_to_sql(where, params)
+
+        columns: list[str] = [c for c, _ in order_by]
+        operators: list[str] = [">" if d.lower() == "asc" else "<" for _, d in order_by]
+        # Named parameters cannot be mixed with positional ones, so the values are bound by name in that case
+        named: bool = isinstance(params, Mapping)
+        marks: list[str] = [f":_after_{n}" if named else "?" for n in range(len(columns))]
+        after_sql: str
+        after_params: list[SQLValue]
+
+        if len(set(operators)) == 1:
+            # Row values are compared in a single index search when all columns are sorted the same way
+            after_sql = f"({','.join(columns)}) {operators[0]} ({','.join(marks)})"
+            after_params = list(after)
+        else:
+            conditions: list[str] = []
+            for n in range(len(columns)):
+                equals: list[str] = [f"{c} = {m}" for c, m in zip(columns[:n], marks)]
+                conditions.append(f"({' and '.join([*equals, f'{columns[n]} {operators[n]} {marks[n]}'])})")
+            after_sql = " or ".join(conditions)
+            after_params = [v for n in range(len(columns)) for v in after[: n + 1]]
+
+        return self.select(
+            f"({where}) and ({after_sql})" if where else after_sql,
+            {**params, **{f"_after_{n}": v for n, v in enumerate(after)}} if named else [*params, *after_params],
+            order_by,
+            limit,
+            validate=validate,
+        )
 
     def count(
         self,
@@ -243,19 +448,23 @@ class Table(Generic[_M]):
         :param offset: The offset to start the results from.
         :return: A ``Cursor`` instance.
         """
-        where, params = _where_to_sql(where, params, self.primary_keys)
-
-        sql: list[str] = [f"select count(*) from {self.name}"]
+        sql, params = self._build_select(self._count_sql, where, params, None, limit, offset)
+        return self.database.execute(sql, params).fetchone()[0]
 
-        if where:
-            sql.append(f"where {where}")
+    def exists(self, where: _W | _M | None = None, params: list[SQLValue] | None = None) -> bool:
+        """
+        Check whether the table contains any entries.
 
-        if limit is not None:
-            sql.append(f"limit {limit}")
-        if offset is not None:
-            sql.append(f"offset {offset}")
+        Unlike ``count`` and ``select``, the query stops at the first matching row and no model is built.
 
-        return self.database.execute(" ".join(sql), params).fetchone()[0]
+        :param where: The where statement to use. This can be a string, a dictionary containing column names and
+            values, or an instance of the model used by the table if primary keys have been defined.
+        :param params: The parameters to use for the query, they are ignored if the ``where`` argument is anything but
+            a string.
+        :return: ``True`` if at least one entry matches ``where``, ``False`` otherwise.
+        """
+        sql, params = self._build_select(self._exists_sql, where, params, None, 1, None)
+        return self.database.execute(sql, params).fetchone() is not None
 
     def insert(self, *rows: _M, on_exists: Literal["ignore", "replace", "error"] = "error") -> int:
         """
@@ -266,29 +475,80 @@ class Table(Generic[_M]):
             replace any existing entry, "error" to raise an error. Defaults to "error".
         :return: The number of inserted rows.
         """
-        cols: list[ColumnSpec] = list(self.columns.values())
-        sql: list[str] = ["insert"]
+        return self._insert_values(map(self._row_values, rows), on_exists)
+
+    def _row_values(self, row: _M) -> tuple[SQLValue, ...]:
+        """
+        Convert an object into a tuple of SQLite-compatible values, in the same order as the columns.
 
-        if on_exists in ("ignore", "replace"):
-            sql.append(f"or {on_exists}")
+        :param row: The object to convert.
+        :return: A tuple of values.
+        """
+        return tuple([to_sql(getattr(row, name)) for name, to_sql in self._columns_to_sql])
+
+    def _insert_values(
+        self,
+        values: Iterable[Sequence[SQLValue]],
+        on_exists: Literal["ignore", "replace", "upsert", "error"] = "error",
+    ) -> int:
+        """
+        Insert rows of values already converted to SQLite-compatible types, in the same order as the columns.
 
-        sql.append(f"into {self.name}")
+        :param values: The rows of values to insert.
+        :param on_exists: What to do if the object exists, see ``Table.insert``. "upsert" updates the existing row in
+            place, see ``Table.upsert``.
+        :return: The number of inserted rows.
+        """
+        insert_sql, conflict_sql = self._insert_sql.get(on_exists, self._insert_sql["error"])
+        rows_per_statement: int = max(
+            1,
+            min(_INSERT_ROWS_PER_STATEMENT, self.database.getlimit(SQLITE_LIMIT_VARIABLE_NUMBER) // len(self._columns)),
+        )
+        batch_sql: str = f"{insert_sql} {','.join([self._insert_row_sql] * rows_per_statement)}{conflict_sql}"
+        values = iter(values)
+        inserted: int = 0
+
+        # Insert full batches of rows with one statement each, so SQLite steps through one statement per batch instead
+        # of per row. The remaining rows use the single-row statement, so the statement cache only holds two entries.
+        while len(batch := list(islice(values, rows_per_statement))) == rows_per_statement:
+            inserted += self.database.execute(batch_sql, list(chain.from_iterable(batch))).rowcount
+
+        if batch:
+            inserted += self.database.executemany(f"{insert_sql} {self._insert_row_sql}{conflict_sql}", batch).rowcount
+
+        return inserted
+
+    def insert_select(
+        self,
+        select: str,
+        params: list[SQLValue] | None = None,
+        on_exists: Literal["ignore", "replace", "error"] = "error",
+    ) -> int:
+        """
+        Insert the results of a select statement into the table.
 
-        sql.append(f"({','.join(c.name for c in cols)}) values ({','.join('?' * len(cols))})")
+        The rows are copied within SQLite and never converted into models. The statement must return columns with the
+        same names as the table's, any other column is ignored.
 
-        return self.database.executemany(
-            " ".join(sql),
-            (tuple(c.to_sql(getattr(row, c.name)) for c in cols) for row in rows),
-        ).rowcount
+        :param select: The select statement whose results should be inserted.
+        :param params: The parameters to use for the select statement.
+        :param on_exists: What to do if the object exists, see ``Table.insert``.
+        :return: The number of inserted rows.
+        """
+        insert_sql: str = self._insert_select_sql.get(on_exists, self._insert_select_sql["error"])
+        return self.database.execute(f"{insert_sql} ({select})", params or []).rowcount
 
     def upsert(self, *rows: _M) -> int:
         """
         Insert entries into the table or update existing entries.
 
+        Existing entries are matched by primary key and updated in place. Tables without primary keys replace any
+        entry that conflicts with a new one.
+
         :param rows: The objects to upsert.
         :return: The number of inserted/modified rows.
         """
-        return self.insert(*rows, on_exists="replace")
+        return self._insert_values(map(self._row_values, rows), "upsert")
 
     def update(self, row: _M, where: _W | _M = None, params: list[SQLValue] | None = None) -> int:
         """
@@ -299,17 +559,12 @@ class Table(Generic[_M]):
         :param params: The parameters to use for ``where``, if given.
         :return: The number of modified rows.
         """
-        where, params = _where_to_sql(where or row, params, self.primary_keys)
+        where, params = self._where_to_sql(where or row, params)
 
         if not where:
             raise ProgrammingError("Update without where")
 
-        cols: list[ColumnSpec] = list(self.columns.values())
-
-        return self.database.execute(
-            f"update {self.name} set {','.join(f'{c.name} = ?' for c in cols)} where {where}",
-            [*[c.to_sql(getattr(row, c.name)) for c in cols], *params],
-        ).rowcount
+        return self.database.execute(f"{self._update_sql} where {where}", [*self._row_values(row), *params]).rowcount
 
     def delete(self, where: _W | _M) -> int:
         """
@@ -320,7 +575,7 @@ class Table(Generic[_M]):
         :raise ProgrammingError: If ``where`` is empty.
         :return: The number of deleted rows.
         """
-        where, params = _where_to_sql(where, [], self.primary_keys)
+        where, params = self._where_to_sql(where, [])
 
         if not where:
             raise ProgrammingError("Delete without where")
@@ -18,6 +18,25 @@ class KeysTableModel(BaseModel):
     value: object | None
 
 
+def _single_fields(model: Type[BaseModel]) -> frozenset[str]:
+    """
+    Get the fields of a model that can be validated on their own by assigning them to an empty object.
+
+    Model validators and field validators can read other fields, which are missing from an empty object, and frozen
+    fields cannot be assigned at all.
+
+    :param model: The model to get the fields from.
+    :return: A set of field names.
+    """
+    decorators = model.__pydantic_decorators__
+    if decorators.model_validators or model.model_config.get("frozen"):
+        return frozenset()
+    validated: set[str] = {f for d in decorators.field_validators.values() for f in d.info.fields}
+    if "*" in validated:
+        return frozenset()
+    return frozenset(n for n, f in model.model_fields.items() if not f.frozen and n not in validated)
+
+
 class KeysTable(Generic[_M]):
     """
     A class that represents a key-value store table in an SQLite database and allows accessing the contents with a Pydantic model.
@@ -32,8 +51,11 @@ class KeysTable(Generic[_M]):
         :param model: The Pydantic model to create the table for.
         :param name: The name of the table.
         """  # noqa: D205
-        self.table: Table[KeysTableModel] = Table(database, KeysTableModel, name, ["key"])
+        # Rows are only unpacked into key-value pairs, values are validated against the fields of the model
+        self.table: Table[KeysTableModel] = Table(database, KeysTableModel, name, ["key"], validate=False)
         self.model: Type[_M] = model
+        self._field_names: frozenset[str] = frozenset(model.model_fields)
+        self._single_fields: frozenset[str] = _single_fields(model)
 
     @property
     def name(self) -> str:
@@ -54,10 +76,10 @@ class KeysTable(Generic[_M]):
         return self.get(key)
 
     def __setitem__(self, key: str, value: object | None) -> None:
-        if key not in self.model.model_fields:
+        if key not in self._field_names:
             raise AttributeError(f"{self.model.__name__!r} object has no attribute {key!r}")
 
-        self.table.insert(KeysTableModel(key=key, value=value), on_exists="replace")
+        self.table.insert(KeysTableModel.model_construct(key=key, value=value), on_exists="replace")
 
     def create_sql(self, *, exist_ok: bool = False) -> str:
         """Generate the SQL statement to create the table."""
@@ -78,7 +100,9 @@ class KeysTable(Generic[_M]):
 
         :param obj: The object to be saved.
         """
-        self.table.insert(*(KeysTableModel(key=k, value=o) for k, o in obj.model_dump().items()), on_exists="replace")
+        self.table.insert(
+            *(KeysTableModel.model_construct(key=k, value=o) for k, o in obj.model_dump().items()), on_exists="replace"
+        )
 
     @overload
     def get(self) -> _M | None: ...
@@ -93,9 +117,16 @@ class KeysTable(Generic[_M]):
         :param key: If given, return only the value of that field.
         :return: The object stored in the table.
         """
-        if key is not None and key not in self.model.model_fields:
+        if key is not None and key not in self._field_names:
             raise AttributeError(f"{self.model.__name__!r} object has no attribute {key!r}")
 
+        # Only validate the requested field, with its constraints, through an empty object
+        # Fall back to the whole object if the field cannot be validated on its own or is not stored
+        if key in self._single_fields and (item := self.table.select({"key": key}, limit=1).fetchone()) is not None:
+            obj = self.model.model_construct()
+            self.model.__pydantic_validator__.validate_assignment(obj, key, item.value)
+            return getattr(obj, key)
+
         items = self.table.select().fetchall()
         if not items:
             return None
@@ -111,8 +142,10 @@ class KeysTable(Generic[_M]):
 
         :return: The number of updated fields.
         """
-        if missing_keys := [k for k in kwargs if k not in self.model.model_fields]:
+        if missing_keys := [k for k in kwargs if k not in self._field_names]:
             raise AttributeError(
                 f"Fields {', '.join(map(repr, missing_keys))} do not exist in model {self.model.__name__!r}"
             )
-        return self.table.insert(*(KeysTableModel(key=k, value=o) for k, o in kwargs.items()), on_exists="replace")
+        return self.table.insert(
+            *(KeysTableModel.model_construct(key=k, value=o) for k, o in kwargs.items()), on_exists="replace"
+        )
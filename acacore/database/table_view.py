@@ -28,6 +28,8 @@ class View(Generic[_M]):
         name: str,
         select: str,
         ignore: list[str] | None = None,
+        *,
+        validate: bool = True,
     ) -> None:
         """
         :param database: The connection to the database.
@@ -35,12 +37,14 @@ class View(Generic[_M]):
         :param name: The name of the view.
         :param select: The select SQL expression to use to populate the view.
         :param ignore: A list of field names to ignore from the model.
+        :param validate: Whether to validate selected rows with the model. Set to False to construct models without
+            validation for views whose rows can be trusted, defaults to True.
         """  # noqa: D205
         self.database: Connection = database
         self.model: Type[_M] = model
         self.name: str = name
         self.select_stmt: str = select
-        self._table: Table[_M] = Table(self.database, self.model, self.name, ignore=ignore)
+        self._table: Table[_M] = Table(self.database, self.model, self.name, ignore=ignore, validate=validate)
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.name!r}, {self.model.__name__})"
@@ -51,11 +55,14 @@ class View(Generic[_M]):
     def __len__(self) -> int:
         return len(self._table)
 
+    def __bool__(self) -> bool:
+        return self._table.exists()
+
     def __getitem__(self, where: _W | _M) -> _M | None:
         return self._table.select(where, limit=1).fetchone()
 
     def __contains__(self, where: _M) -> bool:
-        return self._table.select(where, limit=1).cursor.fetchone() is not None
+        return self._table.exists(where)
 
     def create_sql(self, *, exist_ok: bool = False) -> str:
         """Generate the SQL statement to create the view."""
@@ -77,6 +84,8 @@ class View(Generic[_M]):
         order_by: list[tuple[str, str]] | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        *,
+        validate: bool | None = None,
     ) -> Cursor[_M]:
         """
         Select entries from the view.
@@ -88,9 +97,11 @@ class View(Generic[_M]):
         :param order_by: A list of column names and direction ("asc", "desc") tuples to sort the results.
         :param limit: The maximum number of results to return.
         :param offset: The offset to start the results from.
+        :param validate: Whether to validate the selected rows with the model, overriding the ``validate`` argument
+            given to the view for this query only.
         :return: A ``Cursor`` instance.
         """
-        return self._table.select(where, params, order_by, limit, offset)
+        return self._table.select(where, params, order_by, limit, offset, validate=validate)
 
     def count(
         self,
@@ -110,3 +121,14 @@ class View(Generic[_M]):
         :return: A ``Cursor`` instance.
         """
         return self._table.count(where, params, limit, offset)
+
+    def exists(self, where: _W | None = None, params: list[SQLValue] | None = None) -> bool:
+        """
+        Check whether the view contains any entries.
+
+        :param where: The where statement to use. This can be a string or a dictionary containing column names and values.
+        :param params: The parameters to use for the query, they are ignored if the ``where`` argument is anything but
+            a string.
+        :return: ``True`` if at least one entry matches ``where``, ``False`` otherwise.
+        """
+        return self._table.exists(where, params)
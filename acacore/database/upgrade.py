@@ -1,32 +1,47 @@
-from json import dumps
-from json import loads
 from sqlite3 import Connection
 from sqlite3 import DatabaseError
 from sqlite3 import OperationalError
 from typing import Callable
 
+from orjson import dumps
+from orjson import loads
 from packaging.version import InvalidVersion
 from packaging.version import Version
 
 from acacore.__version__ import __version__
 
+from .database import _set_pragmas
+from .database import _TUNING_PRAGMAS
+
 __all__ = [
     "upgrade",
     "is_latest",
 ]
 
+_LATEST: Version = Version(__version__)
+_V4_1: Version = Version("4.1.0")
+_V4_1_1: Version = Version("4.1.1")
+
+# Connection settings used while upgrading, they speed up table rebuilds and are restored afterward
+# Synchronous is left to the caller, as it controls the durability of the upgraded data
+_UPGRADE_PRAGMAS: dict[str, str | int] = {
+    pragma: value for pragma, value in _TUNING_PRAGMAS.items() if pragma != "synchronous"
+}
+
 
 # noinspection SqlResolve
 def get_db_version(conn: Connection) -> Version | None:
     try:
-        cur = conn.execute("select VALUE from Metadata where KEY like 'version'").fetchone()
+        cur = conn.execute("select VALUE from Metadata where KEY = 'version'").fetchone()
         return Version(loads(cur[0])) if cur else None
     except (OperationalError, ValueError, InvalidVersion):
         return None
 
 
 def set_db_version(conn: Connection, version: Version) -> Version:
-    conn.execute("insert or replace into Metadata (KEY, VALUE) values (?, ?)", ("version", dumps(str(version))))
+    conn.execute(
+        "insert or replace into Metadata (KEY, VALUE) values (?, ?)", ("version", dumps(str(version)).decode("utf-8"))
+    )
     conn.commit()
     return version
 
@@ -53,19 +68,12 @@ def upgrade_4to4_1(con: Connection) -> Version:
     """)
 
     con.execute("insert or ignore into files_master_tmp select * from files_master")
-    con.execute("update files_master_tmp set processed = 4 where processed != 0")
-
-    con.executemany(
-        "update files_master_tmp set processed = processed + 1 where uuid = ? and processed != 0",
-        ([uuid] for [uuid] in con.execute("select original_uuid from files_access")),
-    )
-
-    con.executemany(
-        "update files_master_tmp set processed = processed + 2 where uuid = ? and processed != 0",
-        ([uuid] for [uuid] in con.execute("select original_uuid from files_statutory")),
-    )
-
-    con.execute("update files_master_tmp set processed = processed - 4 where processed != 0")
+    con.execute("""
+    update files_master_tmp
+    set processed = (case when uuid in (select original_uuid from files_access) then 1 else 0 end) +
+                    (case when uuid in (select original_uuid from files_statutory) then 2 else 0 end)
+    where processed != 0
+    """)
 
     con.execute("drop view files_all")
     con.execute("drop view log_paths")
@@ -122,27 +130,27 @@ def upgrade_4to4_1(con: Connection) -> Version:
         left join files_access    fa on l.file_type = 'access'    and fa.uuid = l.file_uuid
         left join files_statutory fs on l.file_type = 'statutory' and fs.uuid = l.file_uuid
     """)
-    con.commit()
-
-    con.execute("vacuum")
 
-    return set_db_version(con, Version("4.1.0"))
+    return set_db_version(con, _V4_1)
 
 
 def upgrade_4_1to4_1_1(con: Connection) -> Version:
     con.execute("drop table metadata")
     con.execute("create table metadata (key text not null, value text, primary key (key))")
-    con.commit()
-    return set_db_version(con, Version("4.1.1"))
+    return set_db_version(con, _V4_1_1)
+
+
+# Upgrades that rebuild tables and leave free pages behind
+_rebuilding_upgrades: set[Callable[[Connection], Version]] = {upgrade_4to4_1}
 
 
 def get_upgrade_function(current_version: Version, latest_version: Version) -> Callable[[Connection], Version]:
-    if current_version < Version("4.1.0"):
+    if current_version < _V4_1:
         return upgrade_4to4_1
-    elif current_version < Version("4.1.1"):
+    elif current_version < _V4_1_1:
         return upgrade_4_1to4_1_1
     elif current_version < latest_version:
-        return lambda c: set_db_version(c, Version(__version__))
+        return lambda c: set_db_version(c, _LATEST)
     else:
         return lambda _: latest_version
 
@@ -159,8 +167,11 @@ def is_latest(connection: Connection, *, raise_on_difference: bool = False) -> b
         acacore library, or ``raise_on_difference`` is set to ``True`` and the database is not up-to-date.
     :return: True if the database is using the latest version, False otherwise.
     """
-    current_version: Version | None = get_db_version(connection)
-    latest_version: Version = Version(__version__)
+    return _check_version(get_db_version(connection), raise_on_difference=raise_on_difference)
+
+
+def _check_version(current_version: Version | None, *, raise_on_difference: bool = False) -> bool:
+    latest_version: Version = _LATEST
 
     if not current_version:
         raise DatabaseError("Database does not contain version information")
@@ -178,12 +189,39 @@ def upgrade(connection: Connection):
 
     :param connection: A ``Connection`` object to the database.
     """
-    if is_latest(connection):
+    current_version: Version | None = get_db_version(connection)
+    latest_version: Version = _LATEST
+
+    if _check_version(current_version):
         return
 
-    current_version: Version = get_db_version(connection)
-    latest_version: Version = Version(__version__)
+    previous_pragmas: dict[str, str | int] = {
+        pragma: row[0]
+        for pragma in _UPGRADE_PRAGMAS
+        if (row := connection.execute(f"pragma {pragma}").fetchone()) is not None
+    }
+    _set_pragmas(connection, _UPGRADE_PRAGMAS)
 
-    while current_version < latest_version:
-        update_function = get_upgrade_function(current_version, latest_version)
-        current_version = update_function(connection)
+    try:
+        vacuum: bool = False
+
+        # Each step runs in a single transaction, committed when the new version is set
+        while current_version < latest_version:
+            update_function = get_upgrade_function(current_version, latest_version)
+            if not connection.in_transaction:
+                connection.execute("begin")
+            try:
+                current_version = update_function(connection)
+            except BaseException:
+                connection.rollback()
+                raise
+            vacuum = vacuum or update_function in _rebuilding_upgrades
+
+        # Compact the database once after all the steps, instead of after each table rebuild
+        if vacuum:
+            connection.execute("vacuum")
+
+        # Refresh the query planner statistics for the changed tables
+        connection.execute("pragma optimize")
+    finally:
+        _set_pragmas(connection, previous_pragmas)
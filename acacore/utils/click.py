@@ -85,13 +85,13 @@ def check_database_version(ctx: Context, param: Parameter, path: Path):
         return
 
     from acacore.database import FilesDB
-    from acacore.database.upgrade import is_latest
 
-    with FilesDB(path) as db:
-        try:
-            is_latest(db, raise_on_difference=True)
-        except DatabaseError as err:
-            raise BadParameter(err.args[0], ctx, param)
+    # FilesDB checks the version when opened, and only once per database file in the same process
+    # Tuning is disabled, so checking the argument does not switch the database to write-ahead logging
+    try:
+        FilesDB(path, check_initialisation=True, tune=False).close()
+    except DatabaseError as err:
+        raise BadParameter(err.args[0], ctx, param)
 
 
 def start_program(
@@ -1,17 +1,31 @@
+from dataclasses import FrozenInstanceError
+from os import utime
 from pathlib import Path
 from shutil import copy2
 from sqlite3 import DatabaseError
+from sqlite3 import IntegrityError
+from typing import Annotated
+from typing import Self
 from uuid import uuid4
 
 import pytest
 from packaging.version import Version
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import field_validator
+from pydantic import model_validator
+from pydantic import ValidationError
 
 from acacore.__version__ import __version__
 from acacore.database import FilesDB
+from acacore.database.column import ColumnSpec
+from acacore.database.cursor import Cursor
+from acacore.database.database import Table
 from acacore.database.files_db import ActionCount
 from acacore.database.files_db import ChecksumCount
 from acacore.database.files_db import EventPath
 from acacore.database.files_db import SignatureCount
+from acacore.database.table import _INSERT_ROWS_PER_STATEMENT
 from acacore.models.event import Event
 from acacore.models.file import BaseFile
 from acacore.models.file import ConvertedFile
@@ -20,6 +34,33 @@ from acacore.models.file import OriginalFile
 from acacore.utils.functions import find_files
 
 
+class KeysModel(BaseModel):
+    number: Annotated[int, Field(gt=0)] = 1
+    text: str = ""
+    required: int
+
+    @field_validator("text")
+    @classmethod
+    def _upper(cls, value: str) -> str:
+        return value.upper()
+
+
+class KeysModelValidated(BaseModel):
+    low: int
+    high: int
+
+    @model_validator(mode="after")
+    def _check_range(self) -> Self:
+        if self.low > self.high:
+            raise ValueError("low is greater than high")
+        return self
+
+
+class KeysModelFrozen(BaseModel):
+    fixed: int = Field(1, frozen=True)
+    text: str = ""
+
+
 @pytest.fixture
 def database_file(temp_folder: Path) -> Path:
     path: Path = temp_folder / "database.db"
@@ -47,6 +88,23 @@ def test_database_base(database_file: Path):
     assert not db.is_open()
 
 
+def test_database_pragmas(database_file: Path):
+    with FilesDB(database_file) as db:
+        assert db.execute("pragma journal_mode").fetchone()[0] == "delete"
+        assert db.execute("pragma synchronous").fetchone()[0] == 1
+
+    with FilesDB(database_file, pragmas={"journal_mode": "wal"}) as db:
+        assert db.execute("pragma journal_mode").fetchone()[0] == "wal"
+
+    with FilesDB(database_file, pragmas={"synchronous": "full"}) as db:
+        assert db.execute("pragma synchronous").fetchone()[0] == 2
+        assert db.execute("pragma temp_store").fetchone()[0] == 2
+
+    with FilesDB(database_file, tune=False, pragmas={"temp_store": "file"}) as db:
+        assert db.execute("pragma synchronous").fetchone()[0] == 2
+        assert db.execute("pragma temp_store").fetchone()[0] == 1
+
+
 def test_database_tables(database_file: Path):
     with FilesDB(database_file) as db:
         db.init()
@@ -67,6 +125,15 @@ def test_database_tables(database_file: Path):
         assert db.actions_count.name in views
         assert db.checksums_count.name in views
 
+        plan = db.execute(f"explain query plan select * from {db.identification_warnings.name}").fetchall()
+        assert any(f"idx_{db.original_files.name}_identification_warnings" in str(p) for p in plan)
+
+        # Columns are shared between tables with the same model, so they cannot be changed in place
+        column = db.original_files.columns["uuid"]
+        assert any(c is column for c in ColumnSpec.from_model(OriginalFile, ["root"]))
+        with pytest.raises(FrozenInstanceError):
+            column.name = "id"
+
 
 # noinspection DuplicatedCode
 def test_database_insert_select(database_file: Path):
@@ -84,6 +151,7 @@ def test_database_insert_select(database_file: Path):
         db.log.insert(Event(file_uuid=original_file.uuid, file_type="original", operation="test_database_models"))
         db.commit()
 
+        assert db.original_files.insert(original_file, original_file2, on_exists="ignore") == 0
         assert len(db.original_files) == 2
         assert len(db.master_files) == 1
         assert len(db.access_files) == 1
@@ -97,6 +165,10 @@ def test_database_insert_select(database_file: Path):
         assert len(db.signatures_count) == 1
         assert len(db.actions_count) == 1
         assert len(db.checksums_count) == 2
+        assert db.identification_warnings
+        assert db.log_paths.exists({"operation": "test_database_models"})
+        assert not db.log_paths.exists({"operation": "missing"})
+        assert {"operation": "test_database_models"} in db.log_paths
 
         inserted_file = db.original_files[{"uuid": str(original_file.uuid)}]
         assert isinstance(inserted_file, OriginalFile)
@@ -106,6 +178,11 @@ def test_database_insert_select(database_file: Path):
         assert db.original_files[original_file] == inserted_file
         assert inserted_file in db.original_files
 
+        unvalidated_file = db.original_files.select({"uuid": str(original_file.uuid)}, validate=False).fetchone()
+        assert isinstance(unvalidated_file, OriginalFile)
+        assert unvalidated_file.uuid == inserted_file.uuid
+        assert unvalidated_file.relative_path == inserted_file.relative_path
+
         assert isinstance(db.master_files.select().fetchone(), MasterFile)
         assert isinstance(db.access_files.select().fetchone(), ConvertedFile)
         assert isinstance(db.statutory_files.select().fetchone(), ConvertedFile)
@@ -138,6 +215,247 @@ def test_database_cursor(database_file: Path, test_folder: Path):
         with pytest.raises(StopIteration):
             next(cursor)
 
+        columns = list(reversed(db.original_files.columns.values()))
+        cursor = Cursor(db.execute(f"select * from {db.original_files.name}"), OriginalFile, columns)
+        file = cursor.fetchone()
+        assert file == db.original_files.select({"uuid": str(file.uuid)}).fetchone()
+        assert cursor.cursor.fetchone()["uuid"] is not None
+
+
+def test_database_count_views(database_file: Path, test_folder: Path):
+    with FilesDB(database_file) as db:
+        db.init()
+        db.commit()
+
+        files: list[OriginalFile] = [OriginalFile.from_file(f, test_folder) for f in find_files(test_folder)]
+        assert db.original_files.insert(*files) == len(files)
+        db.commit()
+
+        assert sum(c.count for c in db.signatures_count) == len(files)
+        assert sum(c.count for c in db.actions_count) == len(files)
+        assert sum(c.count for c in db.checksums_count) == len(files)
+        assert len(db.checksums_count) == len({f.checksum for f in files})
+        assert len(db.signatures_count) == len({(f.puid, f.signature) for f in files})
+
+
+def test_database_select_after(database_file: Path, test_folder: Path):
+    with FilesDB(database_file) as db:
+        db.init()
+        db.commit()
+
+        files: list[OriginalFile] = [OriginalFile.from_file(f, test_folder) for f in find_files(test_folder)]
+        db.original_files.insert(*files)
+        db.commit()
+
+        def paginate(
+            order_by: list[tuple[str, str]],
+            where: str | None = None,
+            params: list | dict | None = None,
+        ) -> list[OriginalFile]:
+            paged: list[OriginalFile] = db.original_files.select(where, params, order_by, limit=5).fetchall()
+            while page := db.original_files.select_after(
+                [getattr(paged[-1], c) if c == "size" else str(getattr(paged[-1], c)) for c, _ in order_by],
+                order_by,
+                where,
+                params,
+                limit=5,
+            ).fetchall():
+                paged.extend(page)
+            return paged
+
+        # Mixed directions use the or-of-ands comparison, same directions use a row value comparison
+        for order_by in ([("size", "desc"), ("relative_path", "asc")], [("size", "asc"), ("relative_path", "asc")]):
+            expected = [f.relative_path for f in db.original_files.select(order_by=order_by)]
+            assert [f.relative_path for f in paginate(order_by)] == expected
+
+            expected = [f.relative_path for f in db.original_files.select("size > ?", [100], order_by)]
+            assert 0 < len(expected) < len(files)
+            assert [f.relative_path for f in paginate(order_by, "size > ?", [100])] == expected
+            assert [f.relative_path for f in paginate(order_by, "size > :size", {"size": 100})] == expected
+
+        first: str = str(files[0].relative_path)
+        after_first = db.original_files.select_after([first], [("relative_path", "asc")])
+        assert len(after_first.fetchall()) == len([f for f in files if str(f.relative_path) > first])
+
+        with pytest.raises(ValueError, match="Expected 2 values"):
+            db.original_files.select_after([first], [("size", "asc"), ("relative_path", "asc")])
+
+
+def test_database_insert_from_select(database_file: Path, test_folder: Path):
+    with FilesDB(database_file) as db:
+        db.init()
+        db.commit()
+
+        files: list[OriginalFile] = [OriginalFile.from_file(f, test_folder) for f in find_files(test_folder)]
+        db.original_files.insert(*files)
+        db.commit()
+
+        copy: Table[OriginalFile] = Table(
+            db.connection, OriginalFile, "files_original_copy", ["relative_path"], ignore=["root"]
+        )
+        copy.create()
+
+        # Columns that are not in the table are ignored
+        select_all: str = f"select *, 1 as extra_column from {db.original_files.name}"
+        assert copy.insert_select(select_all) == len(files)
+        assert (
+            copy.select(order_by=[("relative_path", "asc")]).fetchall()
+            == db.original_files.select(order_by=[("relative_path", "asc")]).fetchall()
+        )
+
+        with pytest.raises(IntegrityError):
+            copy.insert_select(select_all, on_exists="error")
+        assert copy.insert_select(select_all, on_exists="ignore") == 0
+        assert copy.insert_select(f"{select_all} where size > ?", [0], on_exists="replace") == len(
+            [f for f in files if f.size > 0]
+        )
+        assert len(copy) == len(files)
+
+
+def test_database_insert_batches(database_file: Path):
+    with FilesDB(database_file) as db:
+        db.init()
+        db.commit()
+
+        file = OriginalFile.from_file(database_file, database_file.parent)
+        total: int = _INSERT_ROWS_PER_STATEMENT * 2 + 7
+        files: list[OriginalFile] = [
+            file.model_copy(update={"uuid": uuid4(), "relative_path": Path(f"file_{n}")}) for n in range(total)
+        ]
+
+        assert db.original_files.insert(*files) == total
+        assert len(db.original_files) == total
+        assert db.original_files.insert(*files, on_exists="ignore") == 0
+        assert db.original_files.upsert(*files) == total
+        assert len(db.original_files) == total
+        assert {f.uuid for f in db.original_files} == {f.uuid for f in files}
+
+
+def test_database_events_buffer(database_file: Path):
+    with FilesDB(database_file, events_buffer_size=3) as db:
+        db.init()
+        db.commit()
+
+        db.add_event(Event(operation="test:1"), Event(operation="test:2"))
+        assert len(db.log) == 0
+        db.add_event(Event(operation="test:3"))
+        assert len(db.log) == 3
+
+        db.add_event(Event(operation="test:4"))
+        db.rollback()
+        assert len(db.log) == 0
+
+        db.add_event(Event(operation="test:5"))
+        db.commit()
+        assert [e.operation for e in db.log] == ["test:5"]
+
+        db.add_event(Event(operation="test:6"), flush=True)
+        assert len(db.log) == 2
+        db.commit()
+
+        db.add_event(Event(operation="test:7"))
+        assert db.uncommitted_changes == 1
+        with pytest.raises(DatabaseError, match="uncommitted changes"):
+            db.upgrade()
+        db.rollback()
+
+    # In autocommit mode, events still in the buffer are written when the database is closed
+    with FilesDB(database_file, isolation_level=None) as db:
+        db.add_event(Event(operation="test:8"))
+
+    with FilesDB(database_file) as db:
+        assert [e.operation for e in db.log] == ["test:5", "test:6", "test:8"]
+
+
+def test_database_named_params(database_file: Path):
+    with FilesDB(database_file) as db:
+        db.init()
+        db.log.insert(Event(operation="a:b"), Event(operation="a:b"), Event(operation="c:d"))
+        db.commit()
+
+        params = {"op": "a:b"}
+        assert len(db.log.select("operation = :op", params, limit=1).fetchall()) == 1
+        assert len(db.log.select("operation = :op", params, limit=5, offset=1).fetchall()) == 1
+        assert db.log.count("operation = :op", params, limit=5) == 2
+        assert db.log.exists("operation = :op", params)
+        assert not db.log.exists("operation = :op", {"op": "e:f"})
+        assert db.log_paths.exists("operation = :op", params)
+
+
+def test_database_version_cache(database_file: Path, test_folder: Path):
+    FilesDB.invalidate_version_cache()
+    FilesDB.init(database_file).close()
+
+    with FilesDB(database_file) as db:
+        assert db.version() == Version(__version__)
+
+    # A file replaced by an older database is checked again
+    database_file.unlink()
+    copy2(test_folder / "databases" / "v4_0_0.db", database_file)
+    with pytest.raises(DatabaseError, match="lower than latest version"):
+        FilesDB(database_file)
+
+    with FilesDB(database_file, check_version=False) as db:
+        db.upgrade()
+    FilesDB(database_file).close()
+
+    # A file modified after its check is checked again
+    with FilesDB(database_file, check_version=False) as db:
+        db.metadata.update(version="4.0.0")
+        db.commit()
+    stat = database_file.stat()
+    utime(database_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(DatabaseError, match="lower than latest version"):
+        FilesDB(database_file)
+
+
+def test_database_keys_table(database_file: Path):
+    with FilesDB(database_file) as db:
+        keys = db.create_keys_table(KeysModel, "keys")
+        assert keys.get() is None
+
+        keys.set(KeysModel(number=2, text="a", required=3))
+        assert keys.get() == KeysModel(number=2, text="A", required=3)
+
+        assert keys["number"] == 2
+        assert keys.get("text") == "A"
+
+        keys["number"] = -5
+        with pytest.raises(ValidationError):
+            keys.get()
+        with pytest.raises(ValidationError):
+            keys.get("number")
+
+        keys.update(number=4, text="b")
+        assert keys.get() == KeysModel(number=4, text="B", required=3)
+
+        keys["text"] = "c"
+        assert keys["text"] == "C"
+
+        keys.table.delete({"key": "required"})
+        assert keys["number"] == 4
+        with pytest.raises(ValidationError):
+            keys.get()
+        with pytest.raises(ValidationError):
+            keys.get("required")
+
+
+def test_database_keys_table_whole_object(database_file: Path):
+    with FilesDB(database_file) as db:
+        validated = db.create_keys_table(KeysModelValidated, "keys_validated")
+        validated.set(KeysModelValidated(low=1, high=2))
+        assert validated["low"] == 1
+        assert validated.get("high") == 2
+        validated["low"] = 3
+        with pytest.raises(ValidationError):
+            validated.get("high")
+
+        frozen = db.create_keys_table(KeysModelFrozen, "keys_frozen")
+        frozen.set(KeysModelFrozen(fixed=2, text="a"))
+        assert frozen["fixed"] == 2
+        assert frozen.get("text") == "a"
+        assert frozen.get() == KeysModelFrozen(fixed=2, text="a")
+
 
 def test_database_update_delete(database_file: Path):
     with FilesDB(database_file) as db:
@@ -163,9 +481,25 @@ def test_database_update_delete(database_file: Path):
 
         assert len(db.original_files) == 1
 
+        # Models do not validate assignment, so None must still reach the NOT NULL constraints
+        for field in ("checksum", "relative_path", "uuid", "size"):
+            with pytest.raises(IntegrityError):
+                db.original_files.insert(file2.model_copy(update={field: None}), on_exists="replace")
+
+        file2.lock = True
+        assert db.original_files.upsert(file2) == 1
+        assert db.original_files[file2].lock
+        assert len(db.original_files) == 1
+
+        assert db.original_files
+        assert db.original_files.exists({"uuid": str(file2.uuid)})
+        assert not db.original_files.exists({"uuid": str(uuid4())})
+
         del db.original_files[file1]
 
         assert db.original_files[file1] is None
+        assert file1 not in db.original_files
+        assert not db.original_files
         assert len(db.original_files) == 0
 
         db.rollback()
@@ -190,6 +524,10 @@ def test_database_upgrade(test_folder: Path, temp_folder: Path):
 
         assert db.version() == Version(__version__)
 
+        indices = {r[0] for r in db.execute("select name from sqlite_master where type = 'index'")}
+        assert "idx_files_original_puid_signature" in indices
+        assert "idx_files_original_identification_warnings" in indices
+
         assert db.original_files.select(limit=1).fetchone()
         assert db.master_files.select(limit=1).fetchone()
 